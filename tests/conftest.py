@@ -0,0 +1,38 @@
+"""
+Shared pytest configuration for compare-har.py tests.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Select the non-interactive backend before compare_har imports matplotlib.pyplot,
+# so no GUI toolkit is probed in the main process or any pytest-xdist worker.
+# force=True also switches the backend if a plugin (e.g. pytest-mpl) has
+# already imported pyplot.
+import matplotlib
+matplotlib.use("Agg", force=True)
+
+# Make compare_har importable from the test modules and import it once here,
+# so its pandas/matplotlib imports happen during conftest loading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import compare_har  # noqa: E402,F401
+
+# Upper bound on pytest-xdist workers for "-n auto"; the suite is small enough
+# that more workers only add interpreter startup cost on large machines
+MAX_XDIST_WORKERS = 4
+
+
+def pytest_configure(config):
+    """Register the markers used to select test categories."""
+    config.addinivalue_line("markers", "load: Tests for the load_har function")
+    config.addinivalue_line("markers", "extract: Tests for the extract_timings function")
+    config.addinivalue_line("markers", "compare: Tests for the compare_har_files function")
+    config.addinivalue_line("markers", "integration: Integration tests for complete workflows")
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_auto_num_workers(config):
+    """Cap the number of workers used by ``-n auto`` to avoid oversubscription."""
+    return min(os.cpu_count() or 1, MAX_XDIST_WORKERS)
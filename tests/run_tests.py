@@ -2,115 +2,157 @@
 """
 Test runner script for compare-har.py tests
 
-This script provides an easy way to run all tests with different configurations.
+This script provides an easy way to run the test suite: all selected tests are
+collected and run in a single in-process pytest session.
+
+Usage: python run_tests.py [load] [extract] [compare] [integration] [-v] [--fast] [-x] [--cov]
+
+Extra pytest options can be injected through the PYTEST_ADDOPTS environment variable.
 """
 
-import subprocess
+import argparse
+import functools
+import importlib.util
 import sys
 import os
 
-def run_command(cmd, description):
-    """Run a command and print the result."""
-    print(f"\n{'='*60}")
-    print(f"Running: {description}")
-    print(f"Command: {' '.join(cmd)}")
-    print(f"{'='*60}")
+# Directory containing this script and the test suite
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Test categories that can be selected on the command line, mapped to markers
+TEST_CATEGORIES = {
+    "load": "Run only load_har tests",
+    "extract": "Run only extract_timings tests",
+    "compare": "Run only compare_har_files tests",
+    "integration": "Run only integration tests",
+}
+
+@functools.lru_cache(maxsize=None)
+def is_installed(module_name):
+    """Return True if the given module can be imported, probing only once per name."""
+    return importlib.util.find_spec(module_name) is not None
+
+def parse_args(argv=None):
+    """Parse the test categories and options given on the command line."""
+    parser = argparse.ArgumentParser(
+        description="Run the compare-har.py test suite in a single pytest session"
+    )
+    parser.add_argument("categories", nargs="*", metavar="category",
+                        help=f"Only run these test categories ({', '.join(TEST_CATEGORIES)})")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Show one line per test and full tracebacks for failures")
+    parser.add_argument("--fast", action="store_true",
+                        help="Skip tests marked as slow (such as the real-file end-to-end test)")
+    parser.add_argument("-x", "--exitfirst", action="store_true",
+                        help="Stop the test run on the first failure")
+    parser.add_argument("--cov", action="store_true",
+                        help="Collect a coverage report (requires pytest-cov)")
+    options = parser.parse_args(argv)
     
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        print(result.stdout)
-        if result.stderr:
-            print("STDERR:", result.stderr)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Command failed with exit code {e.returncode}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
-        return False
-    except FileNotFoundError:
-        print(f"Error: Command not found. Make sure pytest is installed.")
-        return False
+    unknown = [name for name in options.categories if name not in TEST_CATEGORIES]
+    if unknown:
+        parser.error(f"unknown test category: {', '.join(unknown)} "
+                     f"(choose from {', '.join(TEST_CATEGORIES)})")
+    return options
 
 def main():
     """Main test runner function."""
+    options = parse_args()
+    
     print("HAR Comparison Tool - Test Suite Runner")
     print("=" * 60)
     
     # Check if pytest is available
-    try:
-        subprocess.run(["pytest", "--version"], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("Error: pytest is not installed or not in PATH")
+    if not is_installed("pytest"):
+        print("Error: pytest is not installed")
         print("Install with: pip install pytest")
         sys.exit(1)
     
+    # Check if pytest-xdist is available, unless it was disabled explicitly
+    # (e.g. PYTEST_ADDOPTS="-p no:xdist" for debugging), in which case the
+    # tests run serially
+    parallel = "no:xdist" not in os.environ.get("PYTEST_ADDOPTS", "")
+    if parallel and not is_installed("xdist"):
+        print("Error: pytest-xdist is not installed")
+        print("Install with: pip install pytest-xdist")
+        print('Or run serially with: PYTEST_ADDOPTS="-p no:xdist"')
+        sys.exit(1)
+    
     # Check if the main module exists
-    main_module_path = os.path.join("..", "compare_har.py")
+    main_module_path = os.path.join(TESTS_DIR, "..", "compare_har.py")
     if not os.path.exists(main_module_path):
         print("Error: compare_har.py not found in parent directory")
         sys.exit(1)
     
-    # Run different test configurations
-    test_configs = [
-        {
-            "cmd": ["pytest", "test_compare_har.py", "-v"],
-            "description": "Basic test run with verbose output"
-        },
-        {
-            "cmd": ["pytest", "test_compare_har.py", "-v", "--tb=long"],
-            "description": "Test run with detailed traceback"
-        },
-        {
-            "cmd": ["pytest", "test_compare_har.py", "-v", "-k", "test_load"],
-            "description": "Run only load_har tests"
-        },
-        {
-            "cmd": ["pytest", "test_compare_har.py", "-v", "-k", "test_extract"],
-            "description": "Run only extract_timings tests"
-        },
-        {
-            "cmd": ["pytest", "test_compare_har.py", "-v", "-k", "test_compare"],
-            "description": "Run only compare_har_files tests"
-        },
-        {
-            "cmd": ["pytest", "test_compare_har.py", "-v", "-k", "integration"],
-            "description": "Run only integration tests"
-        }
-    ]
-    
-    # Optional: Run with coverage if pytest-cov is available
-    try:
-        subprocess.run(["pytest", "--cov", "--version"], capture_output=True, check=True)
-        test_configs.append({
-            "cmd": ["pytest", "test_compare_har.py", "--cov=compare_har", "--cov-report=html", "--cov-report=term"],
-            "description": "Test run with coverage report"
-        })
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("Note: pytest-cov not available, skipping coverage tests")
-    
-    # Run each test configuration
-    results = []
-    for config in test_configs:
-        success = run_command(config["cmd"], config["description"])
-        results.append((config["description"], success))
+    # Build a single pytest invocation covering every requested category
+    args = [os.path.join(TESTS_DIR, "test_compare_har.py")]
+    if parallel:
+        # Distribute tests across CPU cores, keeping each file on one worker
+        args.extend(["-n", "auto", "--dist=loadfile"])
+    markers = []
+    if options.categories:
+        markers.append(" or ".join(options.categories))
+        description = "; ".join(TEST_CATEGORIES[name] for name in options.categories)
+    else:
+        description = "Full test run"
+    
+    # Quiet output keeps the terminal reporter cheap; verbose output is opt-in
+    if options.verbose:
+        args.extend(["-v", "--tb=long"])
+        description += " (verbose output with detailed tracebacks)"
+    else:
+        args.extend(["-q", "--no-header"])
+    
+    if options.fast:
+        markers.append("not slow")
+        description += " (skipping slow tests)"
+    
+    if len(markers) == 1:
+        args.extend(["-m", markers[0]])
+    elif markers:
+        args.extend(["-m", " and ".join(f"({expr})" for expr in markers)])
+    
+    if options.exitfirst:
+        args.append("-x")
+        description += " (stopping at first failure)"
+    
+    # Optional: Coverage doubles the runtime, so it is only collected on request
+    if options.cov:
+        if not is_installed("pytest_cov"):
+            print("Error: --cov requires pytest-cov")
+            print("Install with: pip install pytest-cov")
+            sys.exit(1)
+        # The sys.monitoring based tracer (Python 3.12+) is much cheaper than
+        # sys.settrace; pytest-xdist workers inherit the setting
+        if sys.version_info >= (3, 12):
+            os.environ.setdefault("COVERAGE_CORE", "sysmon")
+        args.extend(["--cov=compare_har", "--cov-report=html", "--cov-report=term"])
+        description += " (with coverage report)"
+    
+    print(f"\n{'='*60}")
+    print(f"Running: {description}")
+    print(f"Arguments: {' '.join(args)}")
+    print(f"{'='*60}")
+    
+    # Imported here, after the availability check above
+    import pytest
+    exit_code = pytest.main(args)
     
     # Summary
     print(f"\n{'='*60}")
     print("TEST SUMMARY")
     print(f"{'='*60}")
     
-    for description, success in results:
-        status = "PASSED" if success else "FAILED"
-        print(f"{status:>8}: {description}")
+    status = "PASSED" if exit_code == 0 else "FAILED"
+    print(f"{status:>8}: {description}")
     
     # Overall result
-    all_passed = all(success for _, success in results)
-    if all_passed:
-        print(f"\n🎉 All test configurations passed!")
+    if exit_code == 0:
+        print(f"\n🎉 All tests passed!")
         sys.exit(0)
     else:
         print(f"\n❌ Some tests failed. Check the output above for details.")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,4 +1,3 @@
-#!/usr/bin/env python3
 """
 Pytest test suite for compare-har.py
 
@@ -6,213 +5,258 @@ This test suite provides comprehensive coverage for the HAR file comparison tool
 including unit tests for individual functions and integration tests for the
 complete workflow.
 
-Run tests with: pytest test_compare_har.py -v
+This module needs conftest.py, so run it through pytest rather than as a script:
+pytest test_compare_har.py, or python run_tests.py
 """
 
 import pytest
 import json
-import tempfile
-import os
-from unittest.mock import patch, mock_open, MagicMock
-import pandas as pd
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import patch, MagicMock
 import matplotlib.pyplot as plt
 
-# Import the functions we want to test
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# orjson is optional; it only speeds up writing the HAR fixtures
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Import the functions we want to test (conftest.py puts compare_har on sys.path)
 from compare_har import load_har, extract_timings, compare_har_files
 
 
+# Sample HAR data shared by the file-based tests
+SAMPLE_HAR = {
+    "log": {
+        "version": "1.2",
+        "entries": [
+            {
+                "request": {"url": "https://example.com"},
+                "response": {"status": 200},
+                "timings": {"wait": 100, "receive": 50}
+            }
+        ]
+    }
+}
+
+HAR1_DATA = {
+    "log": {
+        "version": "1.2",
+        "entries": [
+            {
+                "request": {"url": "https://example.com/api/users"},
+                "response": {"status": 200},
+                "timings": {"wait": 100, "receive": 50, "connect": 30, "dns": 10, "blocked": 5, "send": 5}
+            },
+            {
+                "request": {"url": "https://example.com/api/posts"},
+                "response": {"status": 200},
+                "timings": {"wait": 80, "receive": 40, "connect": 25, "dns": 8, "blocked": 3, "send": 4}
+            }
+        ]
+    }
+}
+
+HAR2_DATA = {
+    "log": {
+        "version": "1.2",
+        "entries": [
+            {
+                "request": {"url": "https://example.com/api/users"},
+                "response": {"status": 200},
+                "timings": {"wait": 120, "receive": 60, "connect": 35, "dns": 12, "blocked": 7, "send": 6}
+            },
+            {
+                "request": {"url": "https://example.com/api/posts"},
+                "response": {"status": 200},
+                "timings": {"wait": 90, "receive": 45, "connect": 28, "dns": 9, "blocked": 4, "send": 5}
+            }
+        ]
+    }
+}
+
+# Timings shared by every sample entry that doesn't specify its own; read-only
+# so a test can't accidentally change them for the tests that follow
+DEFAULT_TIMINGS = MappingProxyType({"wait": 100, "receive": 50, "connect": 30})
+
+
+def write_har(path, data):
+    """Serialize HAR data to the given path and return the path."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data))
+    else:
+        path.write_bytes(json.dumps(data).encode('utf-8'))
+    return path
+
+
+def read_json_export(output_dir):
+    """Load the slowest_requests.json export written by compare_har_files."""
+    data = (output_dir / 'slowest_requests.json').read_bytes()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+@pytest.fixture(scope="module")
+def sample_har_file(tmp_path_factory):
+    """Write SAMPLE_HAR to disk once for every test in the module."""
+    return write_har(tmp_path_factory.mktemp("har") / "sample.har", SAMPLE_HAR)
+
+
+@pytest.fixture(scope="module")
+def har_file_pair(tmp_path_factory):
+    """Write HAR1_DATA and HAR2_DATA to disk once for every test in the module."""
+    har_dir = tmp_path_factory.mktemp("har")
+    return write_har(har_dir / "f1.har", HAR1_DATA), write_har(har_dir / "f2.har", HAR2_DATA)
+
+
+@pytest.fixture
+def mock_sinks(monkeypatch, tmp_path):
+    """
+    Replace the plotting sinks of compare_har_files and run it inside tmp_path.
+    
+    CSV and JSON exports are written for real into the per-test directory, so
+    parallel workers never write to the same files. Figures created during the
+    test are closed afterwards.
+    """
+    sinks = SimpleNamespace(savefig=MagicMock(), show=MagicMock(), output_dir=tmp_path)
+    monkeypatch.setattr('compare_har.plt.savefig', sinks.savefig)
+    monkeypatch.setattr('compare_har.plt.show', sinks.show)
+    monkeypatch.chdir(tmp_path)
+    yield sinks
+    plt.close('all')
+
+
+@pytest.fixture
+def patched_sinks(mock_sinks, monkeypatch):
+    """
+    Extend mock_sinks with a mocked load_har for tests that supply HAR data in memory.
+    
+    Tests set ``patched_sinks.load_har.side_effect`` to the two HAR dictionaries.
+    """
+    mock_sinks.load_har = MagicMock()
+    monkeypatch.setattr('compare_har.load_har', mock_sinks.load_har)
+    return mock_sinks
+
+
+@pytest.fixture(scope="module")
+def run_compare(tmp_path_factory):
+    """
+    Run compare_har_files once on a standard single-entry HAR pair.
+    
+    The patches are only active for the duration of the run; the captured
+    print calls, mocks and output directory are shared by every test in the
+    module that asserts on the result of this comparison.
+    """
+    entry1 = {
+        "request": {"url": "https://example.com/api"},
+        "response": {"status": 200},
+        "timings": {"wait": 100, "receive": 50, "connect": 30, "dns": 10, "blocked": 5, "send": 5}
+    }
+    entry2 = {
+        "request": {"url": "https://example.com/api"},
+        "response": {"status": 200},
+        "timings": {"wait": 150, "receive": 75, "connect": 45, "dns": 15, "blocked": 10, "send": 10}
+    }
+    har1 = {"log": {"version": "1.2", "entries": [entry1]}}
+    har2 = {"log": {"version": "1.2", "entries": [entry2]}}
+    
+    result = SimpleNamespace(load_har=MagicMock(side_effect=[har1, har2]),
+                             savefig=MagicMock(), show=MagicMock(),
+                             output_dir=tmp_path_factory.mktemp("compare"))
+    
+    with pytest.MonkeyPatch.context() as mp, patch('builtins.print') as mock_print:
+        mp.setattr('compare_har.load_har', result.load_har)
+        mp.setattr('compare_har.plt.savefig', result.savefig)
+        mp.setattr('compare_har.plt.show', result.show)
+        mp.chdir(result.output_dir)
+        compare_har_files("file1.har", "file2.har", top_n=1)
+        plt.close('all')
+    
+    result.print_calls = mock_print.call_args_list
+    return result
+
+
+@pytest.mark.load
 class TestLoadHar:
     """Test cases for the load_har function."""
     
-    def test_load_valid_har_file(self):
+    def test_load_valid_har_file(self, sample_har_file):
         """Test loading a valid HAR file."""
-        # Create sample HAR data
-        sample_har = {
-            "log": {
-                "version": "1.2",
-                "entries": [
-                    {
-                        "request": {"url": "https://example.com"},
-                        "response": {"status": 200},
-                        "timings": {"wait": 100, "receive": 50}
-                    }
-                ]
-            }
-        }
-        
-        # Create a temporary file with the sample data
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.har', delete=False) as f:
-            json.dump(sample_har, f)
-            temp_file = f.name
-        
-        try:
-            # Test loading the file
-            result = load_har(temp_file)
-            assert result == sample_har
-            assert "log" in result
-            assert "entries" in result["log"]
-        finally:
-            # Clean up the temporary file
-            os.unlink(temp_file)
+        result = load_har(sample_har_file)
+        assert result == SAMPLE_HAR
+        assert "log" in result
+        assert "entries" in result["log"]
     
-    def test_load_nonexistent_file(self):
+    def test_load_nonexistent_file(self, tmp_path):
         """Test loading a file that doesn't exist."""
         with pytest.raises(FileNotFoundError):
-            load_har("nonexistent_file.har")
+            load_har(tmp_path / "nonexistent_file.har")
     
-    def test_load_invalid_json(self):
+    def test_load_invalid_json(self, tmp_path):
         """Test loading a file with invalid JSON."""
-        # Create a temporary file with invalid JSON
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.har', delete=False) as f:
-            f.write("{ invalid json content")
-            temp_file = f.name
-        
-        try:
-            with pytest.raises(json.JSONDecodeError):
-                load_har(temp_file)
-        finally:
-            os.unlink(temp_file)
+        bad_file = tmp_path / "bad.har"
+        bad_file.write_text("{ invalid json content", encoding='utf-8')
+        
+        with pytest.raises(json.JSONDecodeError):
+            load_har(bad_file)
     
-    def test_load_empty_file(self):
+    def test_load_empty_file(self, tmp_path):
         """Test loading an empty file."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.har', delete=False) as f:
-            temp_file = f.name
+        empty_file = tmp_path / "empty.har"
+        empty_file.write_text("", encoding='utf-8')
         
-        try:
-            with pytest.raises(json.JSONDecodeError):
-                load_har(temp_file)
-        finally:
-            os.unlink(temp_file)
+        with pytest.raises(json.JSONDecodeError):
+            load_har(empty_file)
 
 
+@pytest.mark.extract
 class TestExtractTimings:
     """Test cases for the extract_timings function."""
     
-    def test_extract_complete_timings(self):
-        """Test extracting timings when all values are present."""
-        entry = {
-            "timings": {
-                "blocked": 10,
-                "dns": 20,
-                "connect": 30,
-                "send": 5,
-                "wait": 100,
-                "receive": 25
-            }
-        }
-        
-        result = extract_timings(entry)
-        
-        assert result["blocked"] == 10
-        assert result["dns"] == 20
-        assert result["connect"] == 30
-        assert result["send"] == 5
-        assert result["wait"] == 100
-        assert result["receive"] == 25
-        assert result["total"] == 190  # Sum of all positive values
-    
-    def test_extract_partial_timings(self):
-        """Test extracting timings when some values are missing."""
-        entry = {
-            "timings": {
-                "wait": 100,
-                "receive": 50
-                # Missing: blocked, dns, connect, send
-            }
-        }
-        
-        result = extract_timings(entry)
-        
-        assert result["blocked"] == 0
-        assert result["dns"] == 0
-        assert result["connect"] == 0
-        assert result["send"] == 0
-        assert result["wait"] == 100
-        assert result["receive"] == 50
-        assert result["total"] == 150
-    
-    def test_extract_timings_with_negative_values(self):
-        """Test extracting timings with negative values (which should be excluded from total)."""
-        entry = {
-            "timings": {
-                "blocked": -1,  # Negative value (indicates unavailable)
-                "dns": 20,
-                "connect": -1,  # Negative value (indicates unavailable)
-                "send": 5,
-                "wait": 100,
-                "receive": 25
-            }
-        }
-        
-        result = extract_timings(entry)
-        
-        assert result["blocked"] == -1
-        assert result["dns"] == 20
-        assert result["connect"] == -1
-        assert result["send"] == 5
-        assert result["wait"] == 100
-        assert result["receive"] == 25
-        assert result["total"] == 150  # Only positive values: 20 + 5 + 100 + 25
-    
-    def test_extract_timings_empty(self):
-        """Test extracting timings from empty timings object."""
-        entry = {"timings": {}}
-        
-        result = extract_timings(entry)
-        
-        assert result["blocked"] == 0
-        assert result["dns"] == 0
-        assert result["connect"] == 0
-        assert result["send"] == 0
-        assert result["wait"] == 0
-        assert result["receive"] == 0
-        assert result["total"] == 0
-    
-    def test_extract_timings_with_float_values(self):
-        """Test extracting timings with floating point values."""
-        entry = {
-            "timings": {
-                "blocked": 10.5,
-                "dns": 20.25,
-                "connect": 30.75,
-                "send": 5.1,
-                "wait": 100.9,
-                "receive": 25.3
-            }
-        }
-        
-        result = extract_timings(entry)
-        
-        assert result["blocked"] == 10.5
-        assert result["dns"] == 20.25
-        assert result["connect"] == 30.75
-        assert result["send"] == 5.1
-        assert result["wait"] == 100.9
-        assert result["receive"] == 25.3
-        assert abs(result["total"] - 192.8) < 0.001  # Account for floating point precision
-    
-    def test_extract_timings_with_none_values(self):
-        """Test extract_timings with None values in timings."""
-        entry = {
-            "timings": {
-                "wait": None,
-                "receive": 50,
-                "connect": None
-            }
-        }
-        
-        result = extract_timings(entry)
-        
-        # None values should be treated as 0
-        assert result["wait"] == 0
-        assert result["receive"] == 50
-        assert result["connect"] == 0
-        assert result["total"] == 50
+    @pytest.mark.parametrize("timings, expected", [
+        pytest.param(
+            {"blocked": 10, "dns": 20, "connect": 30, "send": 5, "wait": 100, "receive": 25},
+            # Total is the sum of all positive values
+            {"blocked": 10, "dns": 20, "connect": 30, "send": 5, "wait": 100, "receive": 25, "total": 190},
+            id="complete",
+        ),
+        pytest.param(
+            # Missing: blocked, dns, connect, send
+            {"wait": 100, "receive": 50},
+            {"blocked": 0, "dns": 0, "connect": 0, "send": 0, "wait": 100, "receive": 50, "total": 150},
+            id="partial",
+        ),
+        pytest.param(
+            # Negative values indicate unavailable timings and are excluded from the total
+            {"blocked": -1, "dns": 20, "connect": -1, "send": 5, "wait": 100, "receive": 25},
+            {"blocked": -1, "dns": 20, "connect": -1, "send": 5, "wait": 100, "receive": 25, "total": 150},
+            id="negative-values",
+        ),
+        pytest.param(
+            {},
+            {"blocked": 0, "dns": 0, "connect": 0, "send": 0, "wait": 0, "receive": 0, "total": 0},
+            id="empty",
+        ),
+        pytest.param(
+            {"blocked": 10.5, "dns": 20.25, "connect": 30.75, "send": 5.1, "wait": 100.9, "receive": 25.3},
+            {"blocked": 10.5, "dns": 20.25, "connect": 30.75, "send": 5.1, "wait": 100.9, "receive": 25.3, "total": 192.8},
+            id="float-values",
+        ),
+        pytest.param(
+            # None values should be treated as 0
+            {"wait": None, "receive": 50, "connect": None},
+            {"blocked": 0, "dns": 0, "connect": 0, "send": 0, "wait": 0, "receive": 50, "total": 50},
+            id="none-values",
+        ),
+    ])
+    def test_extract_timings(self, timings, expected):
+        """Test extracting each timing phase and the calculated total."""
+        result = extract_timings({"timings": timings})
+        
+        assert result == pytest.approx(expected)
 
 
+@pytest.mark.compare
+@pytest.mark.usefixtures("mock_sinks")
 class TestCompareHarFiles:
     """Test cases for the compare_har_files function."""
     
@@ -227,54 +271,33 @@ class TestCompareHarFiles:
     
     def create_sample_entry(self, url, status=200, timings=None):
         """Helper method to create a sample HAR entry."""
-        if timings is None:
-            timings = {"wait": 100, "receive": 50, "connect": 30}
-        
         return {
             "request": {"url": url},
             "response": {"status": status},
-            "timings": timings
+            "timings": DEFAULT_TIMINGS if timings is None else timings
         }
     
-    @patch('compare_har.load_har')
-    @patch('compare_har.plt.show')
-    @patch('compare_har.plt.savefig')
-    @patch('pandas.DataFrame.to_csv')
-    @patch('builtins.open', new_callable=mock_open)
-    def test_compare_basic_functionality(self, mock_file, mock_to_csv, mock_savefig, mock_show, mock_load_har):
+    def test_compare_basic_functionality(self, run_compare):
         """Test basic comparison functionality with common URLs."""
-        # Create sample data
-        entry1 = self.create_sample_entry("https://example.com/api", 200, 
-                                         {"wait": 100, "receive": 50, "connect": 30})
-        entry2 = self.create_sample_entry("https://example.com/api", 200, 
-                                         {"wait": 120, "receive": 60, "connect": 35})
-        
-        har1 = self.create_sample_har([entry1])
-        har2 = self.create_sample_har([entry2])
-        
-        mock_load_har.side_effect = [har1, har2]
-        
-        # Capture output by redirecting stdout
-        with patch('builtins.print') as mock_print:
-            compare_har_files("file1.har", "file2.har", top_n=1)
-        
         # Verify that load_har was called with correct arguments
-        assert mock_load_har.call_count == 2
-        mock_load_har.assert_any_call("file1.har")
-        mock_load_har.assert_any_call("file2.har")
+        assert run_compare.load_har.call_count == 2
+        run_compare.load_har.assert_any_call("file1.har")
+        run_compare.load_har.assert_any_call("file2.har")
         
         # Verify that visualization functions were called
-        mock_savefig.assert_called_once_with("latency_deltas.png")
-        mock_show.assert_called_once()
-        
-        # Verify CSV export was called
-        mock_to_csv.assert_called_once_with('slowest_requests.csv', index=False)
-        
-        # Verify JSON file was opened for writing
-        mock_file.assert_called_with('slowest_requests.json', 'w', encoding='utf-8')
+        run_compare.savefig.assert_called_once_with("latency_deltas.png")
+        run_compare.show.assert_called_once()
+        
+        # Verify CSV and JSON exports were written
+        assert (run_compare.output_dir / 'slowest_requests.csv').exists()
+        exported = read_json_export(run_compare.output_dir)
+        assert len(exported) == 1
+        assert exported[0]['url'] == "https://example.com/api"
+        assert exported[0]['har1_total'] == 200
+        assert exported[0]['har2_total'] == 305
+        assert exported[0]['total_diff'] == 105
     
-    @patch('compare_har.load_har')
-    def test_compare_no_common_urls(self, mock_load_har):
+    def test_compare_no_common_urls(self, patched_sinks):
         """Test comparison when there are no common URLs."""
         entry1 = self.create_sample_entry("https://example.com/api1")
         entry2 = self.create_sample_entry("https://example.com/api2")
@@ -282,7 +305,7 @@ class TestCompareHarFiles:
         har1 = self.create_sample_har([entry1])
         har2 = self.create_sample_har([entry2])
         
-        mock_load_har.side_effect = [har1, har2]
+        patched_sinks.load_har.side_effect = [har1, har2]
         
         with patch('builtins.print') as mock_print:
             compare_har_files("file1.har", "file2.har")
@@ -291,12 +314,7 @@ class TestCompareHarFiles:
         print_calls = [call[0][0] for call in mock_print.call_args_list]
         assert any("No common URLs found" in call for call in print_calls)
     
-    @patch('compare_har.load_har')
-    @patch('compare_har.plt.show')
-    @patch('compare_har.plt.savefig')
-    @patch('pandas.DataFrame.to_csv')
-    @patch('builtins.open', new_callable=mock_open)
-    def test_compare_with_domain_filter(self, mock_file, mock_to_csv, mock_savefig, mock_show, mock_load_har):
+    def test_compare_with_domain_filter(self, patched_sinks):
         """Test comparison with domain filtering."""
         entry1 = self.create_sample_entry("https://api.example.com/data")
         entry2 = self.create_sample_entry("https://cdn.example.com/assets")
@@ -306,20 +324,15 @@ class TestCompareHarFiles:
         har1 = self.create_sample_har([entry1, entry2])
         har2 = self.create_sample_har([entry3, entry4])
         
-        mock_load_har.side_effect = [har1, har2]
+        patched_sinks.load_har.side_effect = [har1, har2]
         
         with patch('builtins.print'):
             compare_har_files("file1.har", "file2.har", domain_filter="api.example.com")
         
         # Verify load_har was called
-        assert mock_load_har.call_count == 2
+        assert patched_sinks.load_har.call_count == 2
     
-    @patch('compare_har.load_har')
-    @patch('compare_har.plt.show')
-    @patch('compare_har.plt.savefig')
-    @patch('pandas.DataFrame.to_csv')
-    @patch('builtins.open', new_callable=mock_open)
-    def test_compare_with_status_filter(self, mock_file, mock_to_csv, mock_savefig, mock_show, mock_load_har):
+    def test_compare_with_status_filter(self, patched_sinks):
         """Test comparison with status code filtering."""
         entry1 = self.create_sample_entry("https://example.com/api", 200)
         entry2 = self.create_sample_entry("https://example.com/error", 404)
@@ -329,121 +342,63 @@ class TestCompareHarFiles:
         har1 = self.create_sample_har([entry1, entry2])
         har2 = self.create_sample_har([entry3, entry4])
         
-        mock_load_har.side_effect = [har1, har2]
+        patched_sinks.load_har.side_effect = [har1, har2]
         
         with patch('builtins.print'):
             compare_har_files("file1.har", "file2.har", status_filter=200)
         
         # Verify load_har was called
-        assert mock_load_har.call_count == 2
+        assert patched_sinks.load_har.call_count == 2
     
-    @patch('compare_har.load_har')
-    def test_timing_calculations(self, mock_load_har):
+    def test_timing_calculations(self, run_compare):
         """Test that timing calculations are correct."""
-        # Create entries with known timing differences
-        entry1 = self.create_sample_entry("https://example.com/api", 200, 
-                                         {"wait": 100, "receive": 50, "connect": 30, "dns": 10, "blocked": 5, "send": 5})
-        entry2 = self.create_sample_entry("https://example.com/api", 200, 
-                                         {"wait": 150, "receive": 75, "connect": 45, "dns": 15, "blocked": 10, "send": 10})
-        
-        har1 = self.create_sample_har([entry1])
-        har2 = self.create_sample_har([entry2])
-        
-        mock_load_har.side_effect = [har1, har2]
-        
-        # Capture the printed output to verify calculations
-        with patch('builtins.print') as mock_print, \
-             patch('compare_har.plt.show'), \
-             patch('compare_har.plt.savefig'), \
-             patch('pandas.DataFrame.to_csv'), \
-             patch('builtins.open', mock_open()):
-            compare_har_files("file1.har", "file2.har", top_n=1)
-        
         # Verify that calculations were performed
-        assert mock_load_har.call_count == 2
+        assert run_compare.load_har.call_count == 2
         
         # Check that timing differences were calculated and printed
-        print_calls = [str(call) for call in mock_print.call_args_list]
-        timing_output = ''.join(print_calls)
-        assert "Δ" in timing_output  # Delta symbol should appear in timing differences
+        # Delta symbol should appear in timing differences
+        assert any("Δ" in (c.args[0] if c.args else "") for c in run_compare.print_calls)
 
 
+@pytest.mark.integration
 class TestIntegration:
     """Integration tests for the complete workflow."""
     
-    def test_end_to_end_with_real_files(self):
-        """Test the complete workflow with actual temporary HAR files."""
-        # Create sample HAR data
-        har1_data = {
-            "log": {
-                "version": "1.2",
-                "entries": [
-                    {
-                        "request": {"url": "https://example.com/api/users"},
-                        "response": {"status": 200},
-                        "timings": {"wait": 100, "receive": 50, "connect": 30, "dns": 10, "blocked": 5, "send": 5}
-                    },
-                    {
-                        "request": {"url": "https://example.com/api/posts"},
-                        "response": {"status": 200},
-                        "timings": {"wait": 80, "receive": 40, "connect": 25, "dns": 8, "blocked": 3, "send": 4}
-                    }
-                ]
-            }
-        }
+    def test_end_to_end(self, patched_sinks):
+        """Test the complete workflow with the HAR data supplied in memory."""
+        patched_sinks.load_har.side_effect = [HAR1_DATA, HAR2_DATA]
         
-        har2_data = {
-            "log": {
-                "version": "1.2",
-                "entries": [
-                    {
-                        "request": {"url": "https://example.com/api/users"},
-                        "response": {"status": 200},
-                        "timings": {"wait": 120, "receive": 60, "connect": 35, "dns": 12, "blocked": 7, "send": 6}
-                    },
-                    {
-                        "request": {"url": "https://example.com/api/posts"},
-                        "response": {"status": 200},
-                        "timings": {"wait": 90, "receive": 45, "connect": 28, "dns": 9, "blocked": 4, "send": 5}
-                    }
-                ]
-            }
-        }
+        with patch('builtins.print'):
+            compare_har_files("file1.har", "file2.har", top_n=2)
+        
+        # Both shared URLs are exported, the larger regression first
+        exported = read_json_export(patched_sinks.output_dir)
+        assert [item['url'] for item in exported] == [
+            "https://example.com/api/users",
+            "https://example.com/api/posts",
+        ]
+        assert exported[0]['total_diff'] == 40
+        assert exported[1]['total_diff'] == 21
+        patched_sinks.savefig.assert_called_once_with("latency_deltas.png")
+    
+    @pytest.mark.slow
+    def test_end_to_end_with_real_files(self, har_file_pair, mock_sinks):
+        """Test the complete workflow with actual temporary HAR files."""
+        file1_path, file2_path = har_file_pair
         
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.har', delete=False) as f1:
-            json.dump(har1_data, f1)
-            file1_path = f1.name
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.har', delete=False) as f2:
-            json.dump(har2_data, f2)
-            file2_path = f2.name
-        
-        try:
-            # Run the comparison with mocked output functions
-            with patch('builtins.print'), \
-                 patch('compare_har.plt.show'), \
-                 patch('compare_har.plt.savefig'), \
-                 patch('pandas.DataFrame.to_csv'), \
-                 patch('json.dump'):  # Mock JSON dump instead of file open
-                
-                # This should run without errors
-                compare_har_files(file1_path, file2_path, top_n=2)
-                
-        finally:
-            # Clean up temporary files
-            os.unlink(file1_path)
-            os.unlink(file2_path)
+        # This should run without errors
+        with patch('builtins.print'):
+            compare_har_files(file1_path, file2_path, top_n=2)
 
 
+@pytest.mark.usefixtures("mock_sinks")
 class TestEdgeCases:
     """Test edge cases and error conditions."""
     
-    @patch('compare_har.load_har')
-    def test_empty_har_files(self, mock_load_har):
+    def test_empty_har_files(self, patched_sinks):
         """Test comparison with empty HAR files."""
         empty_har = {"log": {"entries": []}}
-        mock_load_har.side_effect = [empty_har, empty_har]
+        patched_sinks.load_har.side_effect = [empty_har, empty_har]
         
         with patch('builtins.print') as mock_print:
             compare_har_files("file1.har", "file2.har")
@@ -452,12 +407,7 @@ class TestEdgeCases:
         print_calls = [call[0][0] for call in mock_print.call_args_list]
         assert any("No common URLs found" in call for call in print_calls)
     
-    @patch('compare_har.load_har')
-    @patch('compare_har.plt.show')
-    @patch('compare_har.plt.savefig')
-    @patch('pandas.DataFrame.to_csv')
-    @patch('builtins.open', new_callable=mock_open)
-    def test_single_entry(self, mock_file, mock_to_csv, mock_savefig, mock_show, mock_load_har):
+    def test_single_entry(self, patched_sinks):
         """Test comparison with single entry in each file."""
         entry1 = {
             "request": {"url": "https://example.com/api"},
@@ -473,20 +423,21 @@ class TestEdgeCases:
         har1 = {"log": {"entries": [entry1]}}
         har2 = {"log": {"entries": [entry2]}}
         
-        mock_load_har.side_effect = [har1, har2]
+        patched_sinks.load_har.side_effect = [har1, har2]
         
         with patch('builtins.print'):
             compare_har_files("file1.har", "file2.har", top_n=1)
         
-        # Should complete without errors
-        assert mock_load_har.call_count == 2
+        assert patched_sinks.load_har.call_count == 2
+        
+        # The single shared URL is the only exported request
+        exported = read_json_export(patched_sinks.output_dir)
+        assert len(exported) == 1
+        assert exported[0]['har1_total'] == 150
+        assert exported[0]['har2_total'] == 225
+        assert exported[0]['total_diff'] == 75
     
-    @patch('compare_har.load_har')
-    @patch('compare_har.plt.show')
-    @patch('compare_har.plt.savefig')
-    @patch('pandas.DataFrame.to_csv')
-    @patch('builtins.open', new_callable=mock_open)
-    def test_multiple_entries_same_url(self, mock_file, mock_to_csv, mock_savefig, mock_show, mock_load_har):
+    def test_multiple_entries_same_url(self, patched_sinks):
         """Test comparison when multiple entries have the same URL."""
         # This tests the behavior when URLs are duplicated
         entry1a = {
@@ -508,24 +459,25 @@ class TestEdgeCases:
         har1 = {"log": {"entries": [entry1a, entry1b]}}
         har2 = {"log": {"entries": [entry2]}}
         
-        mock_load_har.side_effect = [har1, har2]
+        patched_sinks.load_har.side_effect = [har1, har2]
         
         with patch('builtins.print'):
             # Should handle duplicate URLs (last one wins in dictionary)
             compare_har_files("file1.har", "file2.har", top_n=1)
         
-        assert mock_load_har.call_count == 2
+        assert patched_sinks.load_har.call_count == 2
+        
+        # The second duplicate entry is the one that was compared
+        exported = read_json_export(patched_sinks.output_dir)
+        assert len(exported) == 1
+        assert exported[0]['har1_total'] == 165
 
 
+@pytest.mark.usefixtures("mock_sinks")
 class TestParameterValidation:
     """Test parameter validation and edge cases."""
     
-    @patch('compare_har.load_har')
-    @patch('compare_har.plt.show')
-    @patch('compare_har.plt.savefig')
-    @patch('pandas.DataFrame.to_csv')
-    @patch('builtins.open', new_callable=mock_open)
-    def test_top_n_parameter(self, mock_file, mock_to_csv, mock_savefig, mock_show, mock_load_har):
+    def test_top_n_parameter(self, patched_sinks):
         """Test that top_n parameter works correctly."""
         # Create multiple entries to test top_n functionality
         entries1 = []
@@ -547,14 +499,17 @@ class TestParameterValidation:
         har1 = {"log": {"entries": entries1}}
         har2 = {"log": {"entries": entries2}}
         
-        mock_load_har.side_effect = [har1, har2]
+        patched_sinks.load_har.side_effect = [har1, har2]
         
         with patch('builtins.print'):
             compare_har_files("file1.har", "file2.har", top_n=3)
         
-        assert mock_load_har.call_count == 2
-
-
-if __name__ == "__main__":
-    # Run the tests
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+        assert patched_sinks.load_har.call_count == 2
+        
+        # Only the three largest regressions are exported, slowest first
+        exported = read_json_export(patched_sinks.output_dir)
+        assert [item['url'] for item in exported] == [
+            "https://example.com/api/4",
+            "https://example.com/api/3",
+            "https://example.com/api/2",
+        ]